@@ -4,96 +4,432 @@
 """
 agents_demo.py
 Tiny multi-agent demo using a local LLM via Ollama.
-Flow: Planner -> Reviewer -> Finalizer
+Flow: rule-based extractor first (unless --llm-only), then a single
+Tagger-Summarizer call (--mode fast, default) or Planner -> Reviewer -> Finalizer
+(--mode strict, kept for evaluation)
 Output: strict JSON with exactly 3 topical tags and a <=25-word summary.
 
 Requirements:
 - Ollama running locally (default: http://localhost:11434)
 - Model: smollm:1.7b   (pull it with: `ollama pull smollm:1.7b`)
-- Python 3.11/3.12, packages: ollama, pydantic
+- Python 3.11/3.12, packages: ollama, pydantic (optional: numpy, orjson, for faster JSON handling; yake, for rule-based tags)
 
 Usage examples:
   python agents_demo.py --title "Lamport Clocks" --content-file blog.txt
   python agents_demo.py --title "Intro to Vector Databases" --content "We explain..."
   python agents_demo.py --model smollm:1.7b --title "..." --content "..."
+  python agents_demo.py --mode strict --title "..." --content "..."
+  python agents_demo.py --batch-file posts.jsonl --num-parallel 4
+  python agents_demo.py --batch-file posts.jsonl --batch-size 4
 """
 
 from __future__ import annotations
 import argparse
+import asyncio
+import atexit
+import hashlib
+import importlib.util
 import json
+import logging
+import logging.handlers
+import os
 import re
+import sqlite3
 import sys
-from typing import Any, Dict, List, Optional, Tuple
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import ollama
-from pydantic import BaseModel, ValidationError, field_validator
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError, field_validator
+
+try:  # optional: numpy vectorizes the brace scan in extract_json
+    import numpy as np
+except ImportError:
+    np = None
+
+try:  # optional: YAKE keyword extraction for the rule-based tagger
+    import yake
+except ImportError:
+    yake = None
+
+try:  # optional: orjson is a faster drop-in for the JSON hot paths
+    import orjson
+except ImportError:
+    orjson = None
+
+log = logging.getLogger("agents_demo")
 
 # ----------------------------- Utilities -----------------------------
 
-def extract_json(text: str) -> Dict[str, Any]:
-    # 1) Drop entire fenced code blocks
-    text = re.sub(r"```.*?```", "", text, flags=re.DOTALL)
+_FENCE_RE = re.compile(r"```.*?```", re.DOTALL)
+_WORD_RE = re.compile(r"\b[\w'-]+\b")
+_WS_RE = re.compile(r"\s+")
 
-    # 2) Fast path: try the whole thing as JSON
-    try:
-        return json.loads(text.strip())
-    except Exception:
-        pass
+# Prompt budget for post content; prefill cost grows with every extra token
+MAX_CONTENT_CHARS = int(os.getenv("AGENTS_DEMO_MAX_CONTENT_CHARS", "4000"))
+
+def _loads(s: Union[str, bytes]) -> Any:
+    if orjson is not None:
+        return orjson.loads(s)
+    return json.loads(s)
+
+def _brace_spans_np(text: str) -> List[bytes]:
+    """
+    Top-level {...} spans of `text` as UTF-8 byte slices, found with a
+    vectorized depth scan ('{' and '}' never occur inside multi-byte
+    UTF-8 sequences, so byte offsets are safe to slice on).
+    """
+    buf = text.encode("utf-8", "replace")
+    a = np.frombuffer(buf, np.uint8)
+    delta = (a == 123).astype(np.int8) - (a == 125).astype(np.int8)
+    depth = np.cumsum(delta, dtype=np.int32)
+    starts = np.flatnonzero((delta == 1) & (depth == 1))
+    ends = np.flatnonzero((delta == -1) & (depth == 0))
+    # pair each start with the first closing brace after it
+    idx = np.searchsorted(ends, starts)
+    return [buf[s:ends[i] + 1] for s, i in zip(starts.tolist(), idx.tolist()) if i < len(ends)]
 
-    # 3) Scan for balanced {...} candidates and try each
-    candidates = []
+def _brace_spans_find(text: str) -> List[str]:
+    """
+    Same top-level {...} spans without numpy: hop between braces with
+    str.find (C-level search), so Python only runs once per brace.
+    """
+    spans = []
     depth = 0
-    start = None
-    for i, ch in enumerate(text):
-        if ch == '{':
+    start = 0
+    o = text.find("{")
+    c = text.find("}")
+    while c != -1:  # with no '}' left, nothing further can close
+        if o != -1 and o < c:
             if depth == 0:
-                start = i
+                start = o
             depth += 1
-        elif ch == '}':
+            o = text.find("{", o + 1)
+        else:
             if depth:
                 depth -= 1
-                if depth == 0 and start is not None:
-                    candidates.append(text[start:i+1])
+                if depth == 0:
+                    spans.append(text[start:c + 1])
+            c = text.find("}", c + 1)
+    return spans
 
-    for c in candidates:
+def extract_json(text: str) -> Dict[str, Any]:
+    # 1) Drop entire fenced code blocks
+    text = _FENCE_RE.sub("", text)
+
+    # 2) Fast path: try the whole thing as JSON
+    try:
+        return _loads(text.strip())
+    except Exception:
+        pass
+
+    # 3) Try each top-level balanced {...} candidate
+    spans = _brace_spans_np(text) if np is not None else _brace_spans_find(text)
+    for c in spans:
         try:
-            return json.loads(c)
+            return _loads(c)
         except Exception:
             continue
 
+    # 4) Fallback: let the C decoder parse from each '{' in turn
+    dec = json.JSONDecoder()
+    i = text.find("{")
+    while i != -1:
+        try:
+            obj, _ = dec.raw_decode(text, i)
+            return obj
+        except ValueError:
+            i = text.find("{", i + 1)
+
     raise ValueError("No JSON object found in model output.")
 
-def word_count(s: str) -> int:
-    return len([w for w in re.findall(r"\b[\w'-]+\b", s)])
+def compact_json(obj: Any) -> str:
+    # No whitespace after separators: fewer prompt tokens to prefill
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
 
-def call_ollama(
+def _prep(content: str, max_chars: int = MAX_CONTENT_CHARS) -> str:
+    """Collapse whitespace and cut content to max_chars (at a word boundary)."""
+    content = _WS_RE.sub(" ", content).strip()
+    if len(content) > max_chars:
+        content = content[:max_chars].rsplit(" ", 1)[0]
+    return content
+
+def word_count(s: str, cap: Optional[int] = None) -> int:
+    """Count words; with `cap`, stop scanning once the count exceeds it."""
+    it = _WORD_RE.finditer(s)
+    if cap is None:
+        return sum(1 for _ in it)
+    n = 0
+    for _ in it:
+        n += 1
+        if n > cap:
+            break
+    return n
+
+# Disk cache for validated stage outputs ("ir:*"); raw responses are never
+# cached, so a malformed reply is retried on the next run instead of replayed.
+DEFAULT_CACHE_PATH = os.getenv(
+    "AGENTS_DEMO_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "agents_demo", "cache.sqlite3")
+)
+
+class DiskCache:
+    """
+    Tiny SQLite-backed key/value store, namespaced by pipeline tier.
+    WAL mode plus a busy timeout lets several CLI processes (e.g. parallel
+    batch runs) read and write the same file without losing entries.
+    Values are stored as JSON.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def get(self, namespace: str, key: str) -> Any:
+        row = self._db.execute("SELECT value FROM kv WHERE key = ?", (f"{namespace}:{key}",)).fetchone()
+        return _loads(row[0]) if row is not None else None
+
+    def put(self, namespace: str, key: str, value: Any) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO kv (key, value) VALUES (?, ?)", (f"{namespace}:{key}", compact_json(value))
+        )
+
+    def close(self) -> None:
+        self._db.close()
+
+_CACHE: Optional[DiskCache] = None
+
+def configure_cache(path: Optional[str] = DEFAULT_CACHE_PATH) -> None:
+    """Enable the disk cache at `path`, or disable it with None."""
+    global _CACHE
+    if _CACHE is not None:
+        _CACHE.close()
+        _CACHE = None
+    if path:
+        _CACHE = DiskCache(path)
+
+# Registered once; closes whichever cache is configured at exit
+atexit.register(configure_cache, None)
+
+def cache_key(*parts: str) -> str:
+    # SHA-256 over the normalized parts, so keys never hold prompt text
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.strip().encode("utf-8"))
+        h.update(b"\x1f")
+    return h.hexdigest()
+
+def cache_get(namespace: str, key: str) -> Any:
+    return _CACHE.get(namespace, key) if _CACHE is not None else None
+
+def cache_put(namespace: str, key: str, value: Any) -> None:
+    if _CACHE is not None:
+        _CACHE.put(namespace, key, value)
+
+# Keep the model loaded between stages/runs, and pin the context size so a
+# different num_ctx never forces a reload that would drop the prefix cache.
+KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "10m")
+NUM_CTX = int(os.getenv("AGENTS_DEMO_NUM_CTX", "4096"))
+
+class _ConversationCache:
+    """
+    Serializes /api/chat request bodies ourselves, memoizing the JSON
+    encoding of system messages. Every stage of a pipeline shares the same
+    (large) Title/Content system message, so it is encoded once and spliced
+    into each body, instead of being rebuilt and re-validated as a Message
+    and re-encoded by the ollama client on every call.
+    """
+
+    def __init__(self, maxsize: int = 64):
+        self._maxsize = maxsize
+        self._system: "OrderedDict[str, str]" = OrderedDict()
+
+    def _system_message(self, content: str) -> str:
+        encoded = self._system.get(content)
+        if encoded is None:
+            encoded = compact_json({"role": "system", "content": content})
+            self._system[content] = encoded
+            if len(self._system) > self._maxsize:
+                self._system.popitem(last=False)
+        else:
+            self._system.move_to_end(content)
+        return encoded
+
+    def body(
+        self,
+        model: str,
+        system_prompt: Optional[str],
+        user_prompt: str,
+        temperature: float,
+        schema: Optional[Dict[str, Any]],
+        stream: bool,
+    ) -> bytes:
+        messages = [compact_json({"role": "user", "content": user_prompt})]
+        if system_prompt:
+            messages.insert(0, self._system_message(system_prompt))
+        rest = compact_json({
+            "model": model,
+            "stream": stream,
+            # a JSON Schema constrains keys/types/counts; plain "json" only syntax
+            "format": schema or "json",
+            "options": {"temperature": temperature, "num_ctx": NUM_CTX},
+            "keep_alive": KEEP_ALIVE,
+        })
+        return ('{"messages":[' + ",".join(messages) + "]," + rest[1:]).encode("utf-8")
+
+_CONVERSATIONS = _ConversationCache()
+
+# One pooled keep-alive client (host from $OLLAMA_HOST) for every call,
+# instead of a new connection per request. HTTP/2 is enabled when `h2` is
+# installed; httpx only negotiates it over TLS, i.e. for remote https hosts.
+_HTTP2 = importlib.util.find_spec("h2") is not None
+_CLIENT = ollama.Client(http2=_HTTP2)
+_ACLIENT: Optional[Tuple[asyncio.AbstractEventLoop, ollama.AsyncClient]] = None
+
+def _async_client() -> ollama.AsyncClient:
+    # httpx async pools are bound to the event loop that first used them,
+    # so keep one client per loop (each asyncio.run gets a fresh one).
+    global _ACLIENT
+    loop = asyncio.get_running_loop()
+    if _ACLIENT is None or _ACLIENT[0] is not loop:
+        _ACLIENT = (loop, ollama.AsyncClient(http2=_HTTP2))
+    return _ACLIENT[1]
+
+async def _close_async_client() -> None:
+    # Close this loop's client before the loop ends; it cannot be closed
+    # (and would only leak its sockets) once asyncio.run has returned.
+    global _ACLIENT
+    if _ACLIENT is not None and _ACLIENT[0] is asyncio.get_running_loop():
+        client, _ACLIENT = _ACLIENT[1], None
+        await client.close()
+
+# Chunks still read after the JSON object closes, before giving up the stream
+STREAM_DRAIN_CHUNKS = 16
+
+class _JsonCloseTracker:
+    """
+    Follows {...} nesting across streamed chunks (ignoring braces inside
+    string literals) and reports when the first top-level object closes.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, chunk: str) -> bool:
+        for ch in chunk:
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = self.depth > 0
+            elif ch == "{":
+                self.depth += 1
+            elif ch == "}" and self.depth:
+                self.depth -= 1
+                if self.depth == 0:
+                    return True
+        return False
+
+class _StreamCollector:
+    """
+    Collects streamed chat chunks up to the close of the first JSON object,
+    then keeps draining the tail (usually whitespace, then the final `done`
+    record) so the connection returns to the pool. feed() returns True when
+    the caller should stop reading: a model that keeps going past
+    STREAM_DRAIN_CHUNKS is cut off, which drops the connection instead.
+    """
+
+    def __init__(self):
+        self.parts: List[str] = []
+        self.tracker = _JsonCloseTracker()
+        self.tail: Optional[int] = None  # chunks read since the object closed
+
+    def feed(self, part: Any) -> bool:
+        if self.tail is not None:
+            self.tail += 1
+            return self.tail >= STREAM_DRAIN_CHUNKS
+        chunk = part["message"]["content"]
+        self.parts.append(chunk)
+        if self.tracker.feed(chunk):
+            self.tail = 0
+        return False
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+
+async def acall_ollama(
     model: str,
     system_prompt: Optional[str],
     user_prompt: str,
     temperature: float = 0.1,
+    stream: bool = True,
+    schema: Optional[Dict[str, Any]] = None,
 ) -> str:
     """
     Call Ollama chat endpoint with (optional) system + user messages.
     Returns model's text string.
+    When streaming, stops collecting as soon as the first JSON object closes.
+    `schema` (a JSON Schema dict) constrains decoding; default is plain JSON mode.
+    Uses ollama.AsyncClient, so independent requests can overlap on the
+    server (see OLLAMA_NUM_PARALLEL).
     """
-    messages = []
-    if system_prompt:
-        messages.append({"role": "system", "content": system_prompt})
-    messages.append({"role": "user", "content": user_prompt})
-
-    
-    
-    resp = ollama.chat(
-    model=model,
-    messages=messages,
-    options={"temperature": temperature, "format": "json"} 
-)
-    return resp["message"]["content"]
+    # Posts the pre-serialized body through the client's request helper
+    # (public chat() would rebuild and re-encode every message).
+    client = _async_client()
+    body = _CONVERSATIONS.body(model, system_prompt, user_prompt, temperature, schema, stream)
+    if stream:
+        collector = _StreamCollector()
+        gen = await client._request(ollama.ChatResponse, "POST", "/api/chat", content=body, stream=True)
+        try:
+            async for part in gen:
+                if collector.feed(part):
+                    break
+        finally:
+            await gen.aclose()
+        return collector.text
+    return (await client._request(ollama.ChatResponse, "POST", "/api/chat", content=body))["message"]["content"]
+
+def call_ollama(
+    model: str,
+    system_prompt: Optional[str],
+    user_prompt: str,
+    temperature: float = 0.1,
+    stream: bool = True,
+    schema: Optional[Dict[str, Any]] = None,
+) -> str:
+    """
+    Blocking twin of acall_ollama on the shared sync client, for callers
+    outside an event loop.
+    """
+    body = _CONVERSATIONS.body(model, system_prompt, user_prompt, temperature, schema, stream)
+    if stream:
+        collector = _StreamCollector()
+        gen = _CLIENT._request(ollama.ChatResponse, "POST", "/api/chat", content=body, stream=True)
+        try:
+            for part in gen:
+                if collector.feed(part):
+                    break
+        finally:
+            gen.close()
+        return collector.text
+    return _CLIENT._request(ollama.ChatResponse, "POST", "/api/chat", content=body)["message"]["content"]
 
 # ----------------------------- Schemas -------------------------------
 
+# json_schema_extra only shapes the schema sent to Ollama for constrained
+# decoding; the validators below stay the source of truth.
 class PlannerOut(BaseModel):
-    proposed_tags: List[str]
+    proposed_tags: List[str] = Field(json_schema_extra={"minItems": 3, "maxItems": 6})
     draft_summary: str
 
     @field_validator("proposed_tags")
@@ -104,7 +440,7 @@ class PlannerOut(BaseModel):
         return v
 
 class ReviewerOut(BaseModel):
-    approved_tags: List[str]
+    approved_tags: List[str] = Field(json_schema_extra={"minItems": 3, "maxItems": 3})
     edited_summary: str
 
     @field_validator("approved_tags")
@@ -118,7 +454,7 @@ class ReviewerOut(BaseModel):
 
 # Final JSON that must be printed
 class PublishOut(BaseModel):
-    tags: List[str]
+    tags: List[str] = Field(json_schema_extra={"minItems": 3, "maxItems": 3})
     summary: str
 
     @field_validator("tags")
@@ -133,12 +469,227 @@ class PublishOut(BaseModel):
     @field_validator("summary")
     @classmethod
     def limit_words(cls, v):
-        if word_count(v) > 25:
+        if not v.strip():
+            raise ValueError("summary must be non-empty.")
+        if word_count(v, cap=25) > 25:
             raise ValueError("summary must be <= 25 words.")
         return v
 
+# Built once at import; reused for every LLM response instead of per-call setup
+_PLANNER_TA = TypeAdapter(PlannerOut)
+_REVIEWER_TA = TypeAdapter(ReviewerOut)
+
+# JSON Schemas passed as Ollama's `format`, so decoding is grammar-constrained
+PLANNER_SCHEMA = PlannerOut.model_json_schema()
+REVIEWER_SCHEMA = ReviewerOut.model_json_schema()
+PUBLISH_SCHEMA = PublishOut.model_json_schema()
+# Each batch result carries the number of the item it answers, so results
+# are matched by that number rather than by position in the array
+BATCH_SCHEMA = {
+    "type": "object",
+    "properties": {"results": {"type": "array", "items": {
+        "type": "object",
+        "properties": {"item": {"type": "integer", "minimum": 1}, **PUBLISH_SCHEMA["properties"]},
+        "required": ["item", *PUBLISH_SCHEMA["required"]],
+    }}},
+    "required": ["results"],
+}
+
+# ----------------------------- Guardrails ----------------------------
+
+def dedup_tags(tags: List[Any]) -> List[str]:
+    """Strip tags and drop empties and case-insensitive duplicates, keeping order."""
+    seen = set()
+    uniq = []
+    for t in tags:
+        t = str(t).strip()
+        if t and t.lower() not in seen:
+            seen.add(t.lower())
+            uniq.append(t)
+    return uniq
+
+def enforce_publish(
+    final_json: Dict[str, Any],
+    fallback_tags: List[str],
+    fallback_summary: str,
+) -> PublishOut:
+    """
+    Deterministically coerce model output into a valid PublishOut:
+    de-dup tags (topping up from fallback_tags) and hard-limit the summary.
+    Raises ValidationError if no valid structure can be built.
+    """
+    # Enforce exactly-3 tags and <=25 words (deterministic guardrails)
+    tags = final_json.get("tags") or fallback_tags
+    if not isinstance(tags, list):
+        tags = [str(tags)]
+    # de-dup & keep first 3
+    uniq = dedup_tags(tags)
+    if len(uniq) < 3:
+        # top up from fallback tags as needed
+        uniq = dedup_tags(uniq + list(fallback_tags))
+    tags = uniq[:3]
+
+    summary = str(final_json.get("summary") or fallback_summary).strip()
+    # hard-limit summary to <=25 words (deterministic)
+    tokens = _WORD_RE.findall(summary)
+    if len(tokens) > 25:
+        # naive compression: keep first 25 words and strip trailing punctuation
+        summary = " ".join(tokens[:25]).rstrip(" ,;:—-")
+
+    try:
+        return PublishOut(tags=tags, summary=summary)
+    except ValidationError:
+        # nothing to fall back to (fast/batch pass no fallbacks): reject
+        if not fallback_tags or not fallback_summary.strip():
+            raise
+        # As a last resort, fall back to the Reviewer values, hard-limited the
+        # same way; rare path, so validate rather than trust the construction
+        fallback_tokens = _WORD_RE.findall(fallback_summary)
+        if len(fallback_tokens) > 25:
+            fallback_summary = " ".join(fallback_tokens[:25]).rstrip(" ,;:—-")
+        return PublishOut(tags=fallback_tags[:3], summary=fallback_summary.strip())
+
+# --------------------------- Rule-based path ---------------------------
+
+# Common English function words; never used as (or inside) a tag
+_STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been
+before being below between both but by can could did do does doing down during each
+few for from further had has have having he her here hers herself him himself his how
+i if in into is it its itself just let like make makes many may me might more most
+much must my myself new no nor not now of off on once one only or other our ours
+ourselves out over own same she should so some such than that the their theirs them
+themselves then there these they this those through to too under until up use used
+uses using very via was we well were what when where which while who whom why will
+with would you your yours yourself yourselves
+""".split())
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+def _is_term(w: str) -> bool:
+    return len(w) > 2 and w not in _STOPWORDS and not w.isdigit()
+
+# Built once; extract_keywords holds no per-document state
+_YAKE = yake.KeywordExtractor(lan="en", n=2, top=10) if yake is not None else None
+
+def _fold(w: str) -> str:
+    """Crude plural folding ("clocks" -> "clock"), so counts pool across both forms."""
+    return w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w
+
+def _keyphrases(title: str, content: str) -> List[str]:
+    """
+    Candidate tags, best first, in their original casing: YAKE when
+    installed, else title-boosted term frequency. Single words that are
+    part of a candidate phrase are dropped, so a post about "vector clocks"
+    never offers "vector" and "clocks" as two separate tags.
+    """
+    if _YAKE is not None:
+        ranked = [kw for kw, _ in _YAKE.extract_keywords(f"{title}. {content}")]
+    else:
+        tokens = _WORD_RE.findall(content)
+        words = [_fold(w.lower()) for w in tokens]
+        title_words = {_fold(w.lower()) for w in _WORD_RE.findall(title)}
+        counts: Dict[str, float] = {}
+        surface: Dict[str, str] = {}  # first spelling seen, e.g. "FastAPI" for "fastapi"
+        for i, w in enumerate(words):
+            if not _is_term(w):
+                continue
+            counts[w] = counts.get(w, 0) + 1
+            surface.setdefault(w, tokens[i])
+            if i + 1 < len(words) and _is_term(words[i + 1]):
+                bigram = f"{w} {words[i + 1]}"
+                counts[bigram] = counts.get(bigram, 0) + 1.5  # favor phrases over single words
+                surface.setdefault(bigram, f"{tokens[i]} {tokens[i + 1]}")
+        scored = [
+            (n * (2 if title_words.intersection(term.split()) else 1), term)
+            for term, n in counts.items()
+            if n >= 2  # must recur in the content to count as topical
+        ]
+        # ties go to the longer phrase
+        ranked = [surface[term] for _, term in sorted(scored, key=lambda x: (-x[0], -len(x[1])))]
+
+    in_phrases = {_fold(w.lower()) for kw in ranked if len(kw.split()) > 1 for w in _WORD_RE.findall(kw)}
+    return [kw for kw in ranked if len(kw.split()) > 1 or _fold(kw.lower()) not in in_phrases]
+
+def _phrase_count(words: List[str], phrase: Tuple[str, ...]) -> int:
+    """Occurrences of the (lowercased) word sequence `phrase` in `words`."""
+    n = len(phrase)
+    return sum(tuple(words[i:i + n]) == phrase for i in range(len(words) - n + 1))
+
+# Rule-based confidence gates; failing any of them defers to the LLM
+CHEAP_MIN_WORDS = 40        # shorter posts carry too little signal to extract from
+CHEAP_MIN_TAG_COUNT = 2     # every tag must recur in the content
+CHEAP_MIN_SUMMARY_TAGS = 2  # the summary sentence must mention this many tags
+
+def cheap_plan(title: str, content: str) -> Optional[PublishOut]:
+    """
+    Deterministic tagger/summarizer: three keyphrases as tags and the
+    best-scoring short sentence as summary. Returns None when the
+    extractors do not yield a confident, schema-valid result: the post is
+    too short, a tag is not recurring, two tags are halves of one recurring
+    phrase, no tag touches the title, or no sentence mentions enough of the
+    tags. The caller then falls back to the LLM. Matching ignores case and
+    plural endings.
+    """
+    words = [_fold(w.lower()) for w in _WORD_RE.findall(content)]
+    if len(words) < CHEAP_MIN_WORDS:
+        return None
+
+    tags: List[str] = []
+    tag_words: List[Tuple[str, ...]] = []
+    for phrase in _keyphrases(title, content):
+        pw = tuple(_fold(w.lower()) for w in _WORD_RE.findall(phrase))
+        # skip phrases that overlap (by word) with one already chosen
+        if not pw or any(set(pw) & set(t) for t in tag_words):
+            continue
+        if _phrase_count(words, pw) < CHEAP_MIN_TAG_COUNT:
+            continue
+        tags.append(phrase)
+        tag_words.append(pw)
+        if len(tags) == 3:
+            break
+    if len(tags) < 3:
+        return None
+    # e.g. "Vector" + "clocks" when the post keeps saying "vector clocks"
+    if any(
+        _phrase_count(words, t + u) >= CHEAP_MIN_TAG_COUNT
+        for t in tag_words for u in tag_words if t is not u
+    ):
+        return None
+    title_words = {_fold(w.lower()) for w in _WORD_RE.findall(title)}
+    if not any(title_words.intersection(t) for t in tag_words):
+        return None
+
+    keywords = {w for t in tag_words for w in t}
+    best, best_score = None, 0.0
+    for sentence in _SENTENCE_RE.split(content.strip()):
+        sw = [_fold(w.lower()) for w in _WORD_RE.findall(sentence)]
+        if not 5 <= len(sw) <= 25:
+            continue
+        if sum(_phrase_count(sw, t) > 0 for t in tag_words) < CHEAP_MIN_SUMMARY_TAGS:
+            continue
+        score = sum(w in keywords for w in sw) / len(sw)
+        if score > best_score:
+            best, best_score = sentence.strip(), score
+    if best is None:
+        return None
+
+    try:
+        return PublishOut(tags=dedup_tags(tags), summary=best)
+    except ValidationError:
+        return None
+
 # ------------------------------ Prompts ------------------------------
 
+# Shared prefix: sent as the system message of every stage, byte-identical,
+# so the server can reuse its KV cache instead of re-prefilling the content.
+# Stage instructions (below) go in the trailing user turn.
+CONTEXT_TMPL = """Title: {title}
+
+Content:
+{content}
+"""
+
 PLANNER_SYS = """You are a precise Planner agent.
 Given a blog title and content, produce JSON with:
 - "proposed_tags": 3-6 short topical tags (1-3 words each, no hashtags, distinct),
@@ -150,12 +701,7 @@ If unsure, return {}.
 If you do not know, return an empty JSON object {}.
 """
 
-PLANNER_USER_TMPL = """Title: {title}
-
-Content:
-{content}
-
-Return JSON with keys: "proposed_tags", "draft_summary".
+PLANNER_USER = """Return JSON with keys: "proposed_tags", "draft_summary".
 """
 
 REVIEWER_SYS = """You are a careful Reviewer.
@@ -166,12 +712,7 @@ If the Planner exceeded limits or missed topics, FIX them.
 Return ONLY JSON.
 """
 
-REVIEWER_USER_TMPL = """Title: {title}
-
-Original content (for context):
-{content}
-
-Planner JSON:
+REVIEWER_USER_TMPL = """Planner JSON:
 {planner_json}
 
 Now return JSON with keys: "approved_tags", "edited_summary".
@@ -190,12 +731,7 @@ Rules:
 - If needed, shorten the summary while preserving meaning.
 """
 
-FINALIZER_USER_TMPL = """Title: {title}
-
-Content (for grounding):
-{content}
-
-Planner JSON:
+FINALIZER_USER_TMPL = """Planner JSON:
 {planner_json}
 
 Reviewer JSON:
@@ -204,59 +740,205 @@ Reviewer JSON:
 Return ONLY the final JSON with keys: "tags", "summary".
 """
 
+# Single-pass ("fast" mode) prompt: the Finalizer's output contract, minus
+# its "merge prior steps" framing since there are no prior steps.
+FAST_SYS = """You are a Tagger-Summarizer.
+Given a blog title and content, output STRICT JSON:
+{
+  "tags": ["t1","t2","t3"],
+  "summary": "<=25 words"
+}
+Rules:
+- Exactly 3 distinct topical tags (1-3 words each, no hashtags).
+- Summary MUST be a single sentence <= 25 words.
+- NO extra keys, NO comments, NO code fences.
+"""
+
+FAST_USER = """Return ONLY the JSON with keys: "tags", "summary".
+"""
+
+BATCH_SYS = """You are a Tagger-Summarizer working on several numbered blog posts at once.
+For EACH item, in item order, produce an object tagged with its item number:
+{"item": 1, "tags": ["t1","t2","t3"], "summary": "<=25 words"}
+Rules:
+- Exactly 3 distinct topical tags per item (1-3 words each, no hashtags).
+- Each summary MUST be a single sentence <= 25 words.
+- Output STRICT JSON: {"results": [ ...one object per item... ]}
+- NO extra keys, NO comments, NO code fences.
+"""
+
+BATCH_ITEM_TMPL = """### Item {i}
+Title: {title}
+
+Content:
+{content}
+"""
+
+BATCH_USER_TMPL = """Return ONLY the JSON object whose "results" array has exactly {n} items.
+"""
+
+# "fast": single pass + guardrails; "strict": Planner -> Reviewer -> Finalizer
+MODES = ("fast", "strict")
+# Fast-mode attempts before falling back to strict; each retry uses a higher
+# temperature so it is a fresh sample rather than the same greedy reply.
+FAST_TEMPERATURES = (0.1, 0.4)
+
+# Items per row-marshaled call; larger batches amortize more overhead but
+# small models start dropping or merging items, and full-length posts
+# (MAX_CONTENT_CHARS each) only fit a few at a time in NUM_CTX.
+DEFAULT_BATCH_SIZE = 4
+
+# Rough chars-per-token for English prose and the tokens to reserve for each
+# item's {"tags", "summary"} reply, for sizing batch prompts against NUM_CTX
+# (Ollama silently truncates prompts that overflow the context window).
+CHARS_PER_TOKEN = 4
+BATCH_REPLY_TOKENS = 80
+
+def _pack_batches(items: List[Tuple[str, str]], batch_size: int) -> List[List[Tuple[str, str]]]:
+    """
+    Split items into consecutive chunks of at most batch_size items whose
+    estimated prompt + reply fits NUM_CTX. An item that is too big on its
+    own still gets a chunk of one (its content is already capped by _prep).
+    """
+    budget = NUM_CTX * CHARS_PER_TOKEN - len(BATCH_SYS) - len(BATCH_USER_TMPL)
+    chunks: List[List[Tuple[str, str]]] = []
+    chunk: List[Tuple[str, str]] = []
+    used = 0
+    for title, content in items:
+        cost = (
+            len(BATCH_ITEM_TMPL) + len(title) + min(len(content), MAX_CONTENT_CHARS)
+            + BATCH_REPLY_TOKENS * CHARS_PER_TOKEN
+        )
+        if chunk and (len(chunk) == batch_size or used + cost > budget):
+            chunks.append(chunk)
+            chunk, used = [], 0
+        chunk.append((title, content))
+        used += cost
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+# Prompt + schema fingerprint per cached tier, folded into every "ir:*" key:
+# editing a stage's instructions or schema invalidates its stored outputs
+# instead of serving them (unvalidated) under the new rules.
+_IR_FINGERPRINTS = {
+    "planner": cache_key(CONTEXT_TMPL, PLANNER_SYS, PLANNER_USER, compact_json(PLANNER_SCHEMA)),
+    "reviewer": cache_key(CONTEXT_TMPL, REVIEWER_SYS, REVIEWER_USER_TMPL, compact_json(REVIEWER_SCHEMA)),
+    # fast and batch results share one tier; both are enforce_publish output
+    "fast": cache_key(
+        CONTEXT_TMPL, FAST_SYS, FAST_USER, BATCH_SYS, BATCH_ITEM_TMPL, BATCH_USER_TMPL, compact_json(BATCH_SCHEMA)
+    ),
+}
+
+def _ir_key(tier: str, *parts: str) -> str:
+    return cache_key(_IR_FINGERPRINTS[tier], *parts)
+
 # ------------------------------ Pipeline -----------------------------
 
-def run_pipeline(model: str, title: str, content: str) -> Tuple[PlannerOut, ReviewerOut, PublishOut]:
+def _rule_based(title: str, content: str) -> Optional[PublishOut]:
+    publish = cheap_plan(title, content)
+    if publish is not None:
+        log.debug("Rule-based tags/summary accepted; LLM skipped")
+    return publish
+
+async def run_pipeline(
+    model: str,
+    title: str,
+    content: str,
+    always_review: bool = False,
+    llm_only: bool = False,
+) -> Tuple[Optional[PlannerOut], Optional[ReviewerOut], PublishOut]:
+    # --- Rule-based first pass ---
+    if not llm_only:
+        publish = _rule_based(title, content)
+        if publish is not None:
+            return None, None, publish
+
+    content = _prep(content)
+    # Stage outputs are cached per (stage prompt, model, title, content), so a
+    # repeat run skips straight to the first stage that has not been seen before.
+    context = CONTEXT_TMPL.format(title=title, content=content)
+
     # --- Planner ---
-    planner_raw = call_ollama(
-        model=model,
-        system_prompt=PLANNER_SYS,
-        user_prompt=PLANNER_USER_TMPL.format(title=title, content=content),
-        temperature=0.2,
-    )
-    print("=== Planner output (raw) ===")
-    print(planner_raw.strip(), flush=True)
+    planner_key = _ir_key("planner", model, title, content)
+    cached = cache_get("ir:planner", planner_key)
+    if cached is not None:
+        planner = PlannerOut.model_construct(**cached)  # validated before caching
+        planner_dump = cached
+        log.debug("=== Planner output (cached) ===\n%s", json.dumps(cached, ensure_ascii=False))
+    else:
+        planner_raw = await acall_ollama(
+            model=model,
+            system_prompt=context,
+            user_prompt=PLANNER_SYS + "\n" + PLANNER_USER,
+            temperature=0.2,
+            schema=PLANNER_SCHEMA,
+        )
+        log.debug("=== Planner output (raw) ===\n%s", planner_raw.strip())
 
-    try:
-        planner_json = extract_json(planner_raw)
-        planner = PlannerOut(**planner_json)
-    except Exception as e:
-        print("\n[Planner JSON parse/validation failed]", e, file=sys.stderr)
-        raise
+        try:
+            planner_json = extract_json(planner_raw)
+            planner = _PLANNER_TA.validate_python(planner_json)
+        except Exception as e:
+            log.error("[Planner JSON parse/validation failed] %s", e)
+            raise
+        planner_dump = planner.model_dump()
+        cache_put("ir:planner", planner_key, planner_dump)
+
+    # --- Shortcut: Planner output already publishable ---
+    if not always_review:
+        tags = dedup_tags(planner.proposed_tags)
+        if len(tags) >= 3 and all(word_count(t, cap=3) <= 3 for t in tags[:3]):
+            try:
+                publish = PublishOut(tags=tags[:3], summary=planner.draft_summary)
+            except ValidationError:
+                pass
+            else:
+                log.debug("Planner output is publishable; Reviewer/Finalizer skipped")
+                return planner, None, publish
+
+    # Serialize once; both downstream prompts embed the same compact string
+    planner_json_s = compact_json(planner_dump)
 
     # --- Reviewer ---
-    reviewer_raw = call_ollama(
-        model=model,
-        system_prompt=REVIEWER_SYS,
-        user_prompt=REVIEWER_USER_TMPL.format(
-            title=title, content=content, planner_json=json.dumps(planner.model_dump(), ensure_ascii=False)
-        ),
-        temperature=0.2,
-    )
-    print("\n=== Reviewer output (raw) ===")
-    print(reviewer_raw.strip(), flush=True)
+    # keyed on the planner output too, since the Reviewer prompt embeds it
+    reviewer_key = _ir_key("reviewer", model, title, content, planner_json_s)
+    cached = cache_get("ir:reviewer", reviewer_key)
+    if cached is not None:
+        reviewer = ReviewerOut.model_construct(**cached)  # validated before caching
+        reviewer_dump = cached
+        log.debug("=== Reviewer output (cached) ===\n%s", json.dumps(cached, ensure_ascii=False))
+    else:
+        reviewer_raw = await acall_ollama(
+            model=model,
+            system_prompt=context,
+            user_prompt=REVIEWER_SYS + "\n" + REVIEWER_USER_TMPL.format(planner_json=planner_json_s),
+            temperature=0.2,
+            schema=REVIEWER_SCHEMA,
+        )
+        log.debug("=== Reviewer output (raw) ===\n%s", reviewer_raw.strip())
 
-    try:
-        reviewer_json = extract_json(reviewer_raw)
-        reviewer = ReviewerOut(**reviewer_json)
-    except Exception as e:
-        print("\n[Reviewer JSON parse/validation failed]", e, file=sys.stderr)
-        raise
+        try:
+            reviewer_json = extract_json(reviewer_raw)
+            reviewer = _REVIEWER_TA.validate_python(reviewer_json)
+        except Exception as e:
+            log.error("[Reviewer JSON parse/validation failed] %s", e)
+            raise
+        reviewer_dump = reviewer.model_dump()
+        cache_put("ir:reviewer", reviewer_key, reviewer_dump)
 
     # --- Finalizer ---
-    final_raw = call_ollama(
+    final_raw = await acall_ollama(
         model=model,
-        system_prompt=FINALIZER_SYS,
-        user_prompt=FINALIZER_USER_TMPL.format(
-            title=title,
-            content=content,
-            planner_json=json.dumps(planner.model_dump(), ensure_ascii=False),
-            reviewer_json=json.dumps(reviewer.model_dump(), ensure_ascii=False),
+        system_prompt=context,
+        user_prompt=FINALIZER_SYS + "\n" + FINALIZER_USER_TMPL.format(
+            planner_json=planner_json_s,
+            reviewer_json=compact_json(reviewer_dump),
         ),
         temperature=0.1,
+        schema=PUBLISH_SCHEMA,
     )
-    print("\n=== Finalized Output (raw) ===")
-    print(final_raw.strip(), flush=True)
+    log.debug("=== Finalized Output (raw) ===\n%s", final_raw.strip())
 
     # Validate final JSON strictly; if the model violated rules, fix here deterministically
     try:
@@ -265,59 +947,252 @@ def run_pipeline(model: str, title: str, content: str) -> Tuple[PlannerOut, Revi
         # Deterministic fallback: build from reviewer
         final_json = {"tags": reviewer.approved_tags, "summary": reviewer.edited_summary}
 
-    # Enforce exactly-3 tags and <=25 words (deterministic guardrails)
-    tags = final_json.get("tags") or reviewer.approved_tags
-    if not isinstance(tags, list):
-        tags = [str(tags)]
-    # de-dup & keep first 3
-    seen = set()
-    uniq = []
-    for t in tags:
-        t = str(t).strip()
-        if t and t.lower() not in seen:
-            seen.add(t.lower())
-            uniq.append(t)
-    if len(uniq) < 3:
-        # top up from reviewer-approved as needed
-        for t in reviewer.approved_tags:
-            if t.lower() not in seen:
-                uniq.append(t)
-                seen.add(t.lower())
-            if len(uniq) == 3:
-                break
-    tags = uniq[:3]
+    publish = enforce_publish(final_json, reviewer.approved_tags, reviewer.edited_summary)
 
-    summary = str(final_json.get("summary") or reviewer.edited_summary).strip()
-    # hard-limit summary to <=25 words (deterministic)
-    tokens = re.findall(r"\b[\w'-]+\b", summary)
-    if len(tokens) > 25:
-        # naive compression: keep first 25 words and strip trailing punctuation
-        summary = " ".join(tokens[:25]).rstrip(" ,;:—-")
+    return planner, reviewer, publish
 
-    try:
-        publish = PublishOut(tags=tags, summary=summary)
-    except ValidationError as ve:
-        # As a last resort, force minimal valid structure (should rarely happen)
-        fallback = PublishOut(
-            tags=reviewer.approved_tags[:3] if reviewer and reviewer.approved_tags else tags[:3],
-            summary=reviewer.edited_summary if reviewer and word_count(reviewer.edited_summary) <= 25 else " ".join(re.findall(r"\b[\w'-]+\b", summary)[:25])
+async def run_pipeline_fast(
+    model: str,
+    title: str,
+    content: str,
+    always_review: bool = False,
+    llm_only: bool = False,
+) -> PublishOut:
+    """
+    Production path ("fast" mode): one dependency-free call tags and
+    summarizes, with the deterministic guardrails standing in for the
+    Reviewer/Finalizer. An invalid result is retried once at a higher
+    temperature; if that also fails, fall back to the 3-stage pipeline.
+    Only validated results are cached.
+    """
+    if not llm_only:
+        publish = _rule_based(title, content)
+        if publish is not None:
+            return publish
+
+    content = _prep(content)
+    content_key = _ir_key("fast", model, title, content)
+    cached = cache_get("ir:fast", content_key)
+    if cached is not None:
+        publish = PublishOut.model_construct(**cached)  # validated before caching
+        log.debug("=== Fast output (cached) ===\n%s", json.dumps(cached, ensure_ascii=False))
+        return publish
+
+    context = CONTEXT_TMPL.format(title=title, content=content)
+    for attempt, temperature in enumerate(FAST_TEMPERATURES, 1):
+        raw = await acall_ollama(
+            model=model,
+            system_prompt=context,
+            user_prompt=FAST_SYS + "\n" + FAST_USER,
+            temperature=temperature,
+            schema=PUBLISH_SCHEMA,
         )
-        publish = fallback
+        log.debug("=== Fast output (raw, attempt %d) ===\n%s", attempt, raw.strip())
 
-    print("\n=== Publish output (strict JSON) ===")
-    print(json.dumps(publish.model_dump(), ensure_ascii=False))
-    return planner, reviewer, publish
+        try:
+            publish = enforce_publish(extract_json(raw), [], "")
+        except (ValueError, AttributeError) as e:
+            log.warning("[Fast output invalid (attempt %d/%d)] %s", attempt, len(FAST_TEMPERATURES), e)
+            continue
+        cache_put("ir:fast", content_key, publish.model_dump())
+        return publish
+
+    log.warning("[Falling back to the strict 3-stage pipeline]")
+    # llm_only: the rule-based pass already ran (or was disabled) above
+    return (await run_pipeline(
+        model=model, title=title, content=content, always_review=always_review, llm_only=True
+    ))[2]
+
+async def run_pipeline_batch(
+    model: str,
+    items: List[Tuple[str, str]],
+    always_review: bool = False,
+    llm_only: bool = False,
+) -> List[PublishOut]:
+    """
+    Row-marshaled variant: tag and summarize all (title, content) items in
+    a single call returning {"results": [...]}, amortizing request overhead
+    and the instruction prefill across items. Each result goes through the
+    same guardrails. Results are matched to items by their "item" number,
+    never by position; items that are missing, botched, or answered more
+    than once are retried one by one with run_pipeline_fast.
+    """
+    publishes: List[Optional[PublishOut]] = [None] * len(items)
+    if not llm_only:
+        for i, (title, content) in enumerate(items):
+            publishes[i] = _rule_based(title, content)
+    # Per-item cache shared with run_pipeline_fast
+    keys = [_ir_key("fast", model, title, _prep(content)) for title, content in items]
+    for i, p in enumerate(publishes):
+        if p is None:
+            cached = cache_get("ir:fast", keys[i])
+            if cached is not None:
+                publishes[i] = PublishOut.model_construct(**cached)  # validated before caching
+    pending = [i for i, p in enumerate(publishes) if p is None]
+    if not pending:
+        return publishes
+
+    user_prompt = "\n".join(
+        BATCH_ITEM_TMPL.format(i=n, title=items[i][0], content=_prep(items[i][1]))
+        for n, i in enumerate(pending, 1)
+    ) + "\n" + BATCH_USER_TMPL.format(n=len(pending))
+    raw = await acall_ollama(
+        model=model,
+        system_prompt=BATCH_SYS,
+        user_prompt=user_prompt,
+        temperature=0.1,
+        schema=BATCH_SCHEMA,
+    )
+    log.debug("=== Batch output (raw) ===\n%s", raw.strip())
+
+    try:
+        results = extract_json(raw).get("results")
+    except (ValueError, AttributeError):
+        results = None
+    if not isinstance(results, list):
+        results = []
+
+    # item number (1-based, as in the prompt) -> result; duplicates are ambiguous
+    by_item: Dict[int, Optional[Dict[str, Any]]] = {}
+    for r in results:
+        n = r.get("item") if isinstance(r, dict) else None
+        if isinstance(n, int) and not isinstance(n, bool) and 1 <= n <= len(pending):
+            by_item[n] = None if n in by_item else r
+    for n, i in enumerate(pending, 1):
+        r = by_item.get(n)
+        if r is None:
+            continue
+        try:
+            publishes[i] = enforce_publish(r, [], "")
+        except ValueError:
+            continue
+        cache_put("ir:fast", keys[i], publishes[i].model_dump())
+
+    missing = [i for i in pending if publishes[i] is None]
+    if missing:
+        log.warning("[Batch output invalid for %d of %d items, retrying them one by one]",
+                    len(missing), len(pending))
+        retried = await asyncio.gather(*(
+            run_pipeline_fast(
+                model=model, title=items[i][0], content=items[i][1],
+                always_review=always_review, llm_only=True,
+            )
+            for i in missing
+        ))
+        for i, p in zip(missing, retried):
+            publishes[i] = p
+    return publishes
+
+def run_batch(
+    model: str,
+    items: List[Tuple[str, str]],
+    mode: str = "fast",
+    num_parallel: Optional[int] = None,
+    always_review: bool = False,
+    batch_size: int = 1,
+    llm_only: bool = False,
+) -> List[PublishOut]:
+    """
+    Run the pipeline over many (title, content) pairs concurrently.
+    At most num_parallel pipelines are in flight; it defaults to the
+    server's OLLAMA_NUM_PARALLEL so requests overlap without queueing.
+    With batch_size > 1 (fast mode only), items are row-marshaled up to
+    batch_size at a time (fewer when their prompt would overflow NUM_CTX)
+    through run_pipeline_batch.
+    """
+    if num_parallel is None:
+        num_parallel = int(os.getenv("OLLAMA_NUM_PARALLEL", "4"))
+
+    async def _run_all() -> List[PublishOut]:
+        sem = asyncio.Semaphore(max(1, num_parallel))
+
+        async def _one(title: str, content: str) -> PublishOut:
+            async with sem:
+                if mode == "strict":
+                    return (await run_pipeline(
+                        model=model, title=title, content=content,
+                        always_review=always_review, llm_only=llm_only,
+                    ))[2]
+                return await run_pipeline_fast(
+                    model=model, title=title, content=content,
+                    always_review=always_review, llm_only=llm_only,
+                )
+
+        async def _chunk(chunk: List[Tuple[str, str]]) -> List[PublishOut]:
+            async with sem:
+                return await run_pipeline_batch(
+                    model=model, items=chunk, always_review=always_review, llm_only=llm_only
+                )
+
+        try:
+            if batch_size > 1 and mode == "fast":
+                chunks = _pack_batches(items, batch_size)
+                return [p for done in await asyncio.gather(*(_chunk(c) for c in chunks)) for p in done]
+            return await asyncio.gather(*(_one(t, c) for t, c in items))
+        finally:
+            await _close_async_client()
+
+    return asyncio.run(_run_all())
 
 # ------------------------------ CLI ---------------------------------
 
+def _setup_logging(verbose: bool) -> None:
+    # Buffer records and flush in batches (or on warnings), so per-stage
+    # debug dumps do not put a blocking write on the critical path.
+    stream = logging.StreamHandler(sys.stderr)
+    stream.setFormatter(logging.Formatter("%(message)s"))
+    log.addHandler(logging.handlers.MemoryHandler(64, flushLevel=logging.WARNING, target=stream))
+    log.setLevel(logging.DEBUG if verbose else logging.WARNING)
+
 def main():
     ap = argparse.ArgumentParser(description="Tiny agentic pipeline using Ollama.")
     ap.add_argument("--model", default="smollm:1.7b", help="Ollama model name, e.g., smollm:1.7b")
-    ap.add_argument("--title", required=True, help="Blog post title")
+    ap.add_argument("--title", help="Blog post title")
     g = ap.add_mutually_exclusive_group(required=True)
     g.add_argument("--content", help="Raw blog content text")
     g.add_argument("--content-file", help="Path to a text file with blog content (UTF-8)")
+    g.add_argument("--batch-file",
+                   help='JSONL file, one {"title": ..., "content": ...} object per line (UTF-8)')
+    ap.add_argument("--num-parallel", type=int, default=None,
+                    help="Max concurrent pipelines in batch mode (default: $OLLAMA_NUM_PARALLEL or 4)")
+    ap.add_argument("--batch-size", type=int, default=1,
+                    help=f"Max posts per LLM call in batch mode, further capped to fit $AGENTS_DEMO_NUM_CTX "
+                         f"(1 = one call per post; try {DEFAULT_BATCH_SIZE})")
+    ap.add_argument("-v", "--verbose", action="store_true",
+                    help="Log raw per-stage model output to stderr")
+    ap.add_argument("--no-cache", action="store_true",
+                    help="Bypass the on-disk cache of validated outputs ($AGENTS_DEMO_CACHE, default ~/.cache/agents_demo/cache.sqlite3)")
+    ap.add_argument("--mode", choices=MODES, default="fast",
+                    help="fast: single call with guardrails (default); "
+                         "strict: full Planner -> Reviewer -> Finalizer chain")
+    ap.add_argument("--always-review", action="store_true",
+                    help="Never skip the Reviewer/Finalizer, even when the Planner output is already valid")
+    ap.add_argument("--llm-only", action="store_true",
+                    help="Skip the rule-based keyword/sentence extractor and always ask the LLM")
     args = ap.parse_args()
+    _setup_logging(args.verbose)
+
+    if not args.no_cache:
+        configure_cache(DEFAULT_CACHE_PATH)
+
+    if args.batch_file:
+        if args.mode == "strict" and args.batch_size > 1:
+            ap.error("--batch-size > 1 requires --mode fast")
+        with open(args.batch_file, "r", encoding="utf-8") as f:
+            rows = [_loads(line) for line in f if line.strip()]
+        items = [(r["title"], r["content"]) for r in rows]
+        publishes = run_batch(
+            model=args.model, items=items, mode=args.mode,
+            num_parallel=args.num_parallel, always_review=args.always_review,
+            batch_size=args.batch_size, llm_only=args.llm_only,
+        )
+        # One line per input row, in input order (pipelines finish out of order)
+        for publish in publishes:
+            print(json.dumps(publish.model_dump(), ensure_ascii=False))
+        return
+
+    if not args.title:
+        ap.error("--title is required unless --batch-file is given")
 
     if args.content:
         content = args.content
@@ -325,7 +1200,17 @@ def main():
         with open(args.content_file, "r", encoding="utf-8") as f:
             content = f.read()
 
-    run_pipeline(model=args.model, title=args.title, content=content)
+    if args.mode == "strict":
+        publish = asyncio.run(run_pipeline(
+            model=args.model, title=args.title, content=content,
+            always_review=args.always_review, llm_only=args.llm_only,
+        ))[2]
+    else:
+        publish = asyncio.run(run_pipeline_fast(
+            model=args.model, title=args.title, content=content,
+            always_review=args.always_review, llm_only=args.llm_only,
+        ))
+    print(json.dumps(publish.model_dump(), ensure_ascii=False))
 
 
 if __name__ == "__main__":